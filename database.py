@@ -1,25 +1,65 @@
+import atexit
 import sqlite3
+import threading
 
 database = 'seen_posts.db'
 
-def get_db_connection():
-    conn = sqlite3.connect(database)
+# seen_posts.db is persisted by committing that one file to git, so every
+# write must land in it directly: keep the rollback journal (no -wal file a
+# cancelled run could leave behind). journal_mode is stored in the file, so
+# setting it also converts a database left in WAL mode back.
+PRAGMAS = (
+    'PRAGMA journal_mode=DELETE',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-2000',
+    'PRAGMA busy_timeout=5000',
+)
+
+_conn = None
+_conn_lock = threading.Lock()
+
+def get_db_connection(check_same_thread=True):
+    conn = sqlite3.connect(database, check_same_thread=check_same_thread)
     conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
     return conn
 
+def get_shared_connection():
+    """Process-wide connection, opened lazily so pragmas are applied only once."""
+    global _conn
+    with _conn_lock:
+        if _conn is None:
+            _conn = get_db_connection(check_same_thread=False)
+            atexit.register(close_shared_connection)
+        return _conn
+
+def close_shared_connection():
+    global _conn
+    with _conn_lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+
 def is_post_seen(post_id):
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute('SELECT 1 FROM seen_posts WHERE post_id = ?', (post_id,))
-        return cursor.fetchone() is not None
-    finally:
-        conn.close()
+    cursor = get_shared_connection().execute('SELECT 1 FROM seen_posts WHERE post_id = ?', (post_id,))
+    return cursor.fetchone() is not None
+
+def get_seen_subset(post_ids):
+    """Return the subset of *post_ids* already in seen_posts, using IN (...) queries."""
+    post_ids = list(post_ids)
+    seen = set()
+    conn = get_shared_connection()
+    # stay under SQLite's default 999 bound-parameter limit
+    for start in range(0, len(post_ids), 900):
+        chunk = post_ids[start:start + 900]
+        placeholders = ','.join('?' * len(chunk))
+        cursor = conn.execute(
+            f'SELECT post_id FROM seen_posts WHERE post_id IN ({placeholders})', chunk
+        )
+        seen.update(row[0] for row in cursor)
+    return seen
 
 def mark_post_as_seen(post_id):
-    conn = get_db_connection()
-    try:
-        conn.execute('INSERT OR IGNORE INTO seen_posts (post_id) VALUES (?)', (post_id,))
-        conn.commit()
-    finally:
-        conn.close()
\ No newline at end of file
+    with get_shared_connection() as conn:
+        conn.execute('INSERT OR IGNORE INTO seen_posts (post_id) VALUES (?)', (post_id,))
\ No newline at end of file
@@ -1,39 +1,15 @@
-import tweepy, logging, requests, os, time, subprocess, sys, json, re
-from contextlib import closing
-from logging.handlers import RotatingFileHandler
+import tweepy, logging, requests, os, time, subprocess, sys, json, re, queue, atexit, shutil, struct
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 
 from oauth import *
 from reddit import extractContent
-from database import get_db_connection
+from database import get_shared_connection, is_post_seen
 from proxy_manager import get_available_proxy, get_requests_proxies, is_any_proxy_available
 
-def download_media_no_proxy(url: str, filename: str) -> str | None:
-    """
-    Download de imagens SEM proxy (conexão direta).
-    Usado para imagens do Reddit que são públicas.
-    """
-    try:
-        if url.startswith('//'):
-            url = 'https:' + url
-
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-
-        resp = requests.get(url, stream=True, timeout=30, headers=headers)
-        resp.raise_for_status()
-
-        with open(filename, "wb") as f:
-            for chunk in resp.iter_content(8192):
-                f.write(chunk)
-
-        logger.info(f"✅ Downloaded (no proxy): {filename} ({len(resp.content)} bytes)")
-        return filename
-    except Exception as exc:
-        logger.error(f"❌ Download failed for {url}: {exc}")
-        return None
-
-
 def check_proxy_available() -> bool:
     """
     Returns True if at least one configured proxy is reachable.
@@ -49,19 +25,65 @@ except Exception as e:
     yt_dlp = None
     logging.getLogger(__name__).warning("yt_dlp não disponível: %s", e)
 
+# <-- PyAV (optional: in-process mux, ffmpeg CLI is the fallback) -->
+try:
+    import av
+except Exception as e:
+    av = None
+    logging.getLogger(__name__).info("PyAV não disponível, usando ffmpeg CLI: %s", e)
+
+# <-- ijson (optional: streamed Reddit JSON, json is the fallback) -->
+try:
+    import ijson
+except Exception as e:
+    ijson = None
+    logging.getLogger(__name__).info("ijson não disponível, usando json: %s", e)
+
+# <-- orjson (optional: faster JSON decoding, json is the fallback) -->
+try:
+    import orjson
+    _json_loads = orjson.loads
+except Exception:
+    _json_loads = json.loads
+
 # ---------- logging ----------
+# Records go through a queue; a background listener thread owns the file and
+# stdout handlers so log calls on the hot path never block on write().
+LOG_FORMAT = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+
 stream_handler = logging.StreamHandler(sys.stdout)
+stream_handler.setFormatter(LOG_FORMAT)
 
 log_handler = RotatingFileHandler(
     "twitter_bot.log", maxBytes=1_000_000, backupCount=5, encoding="utf-8"
 )
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[log_handler, stream_handler],
+log_handler.setFormatter(LOG_FORMAT)
+
+log_queue: queue.Queue = queue.Queue(-1)
+# QueueHandler only merges args into the message; LOG_FORMAT is applied by the listener
+logging.basicConfig(level=logging.INFO, format="%(message)s", handlers=[QueueHandler(log_queue)])
+
+log_listener = QueueListener(
+    log_queue, log_handler, stream_handler, respect_handler_level=True
 )
+log_listener.start()
+atexit.register(log_listener.stop)
+
 logger = logging.getLogger(__name__)
 
+# ---------- HTTP ----------
+# One pooled session for every Reddit download so keep-alive reuses the
+# TCP/TLS connections to i.redd.it / v.redd.it / www.reddit.com.
+_http = requests.Session()
+_http.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+})
+_http.mount("https://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+))
+
 # ---------- Tweepy ----------
 client = tweepy.Client(
     bearer_token=bearer_token,
@@ -77,10 +99,30 @@ api = tweepy.API(auth)
 # ---------- DB helpers ----------
 
 DB_PATH = "seen_posts.db"
+IMG_PATHS_SEP = "\x1f"  # ASCII unit separator – never appears in a URL
+DB_MAINTENANCE_EVERY = 100  # run incremental_vacuum + ANALYZE every N new seen posts
+VIDEO_META_TTL_HOURS = 24  # how long a cached yt-dlp duration stays valid
+
+
+def _enable_incremental_vacuum(conn) -> None:
+    # auto_vacuum only takes effect on a fresh file; existing DBs need one VACUUM.
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        logger.info("SQLite auto_vacuum switched to INCREMENTAL")
+
+
+def _compact_db(conn) -> None:
+    # executescript steps the pragma to completion; a plain execute() frees only one page
+    conn.executescript("PRAGMA incremental_vacuum(100); ANALYZE;")
+    logger.info("SQLite maintenance done (incremental_vacuum + ANALYZE)")
 
 
 def initialize_db() -> None:
-    with closing(get_db_connection()) as conn, conn:
+    conn = get_shared_connection()
+    _enable_incremental_vacuum(conn)
+
+    with conn:
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS pending_posts (
@@ -93,94 +135,131 @@ def initialize_db() -> None:
             );
             """
         )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_pending_last_attempt "
+            "ON pending_posts(attempts, last_attempt);"
+        )
         conn.execute(
             "CREATE TABLE IF NOT EXISTS seen_posts (post_id TEXT PRIMARY KEY);"
         )
-
-
-def is_post_seen(post_id: str) -> bool:
-    with closing(get_db_connection()) as conn:
-        cur = conn.execute("SELECT 1 FROM seen_posts WHERE post_id = ?", (post_id,))
-        return cur.fetchone() is not None
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS video_meta (
+                url         TEXT PRIMARY KEY,
+                duration    REAL,
+                fetched_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            """
+        )
 
 
 def mark_post_as_seen(post_id: str) -> None:
-    with closing(get_db_connection()) as conn, conn:
-        conn.execute("INSERT OR IGNORE INTO seen_posts(post_id) VALUES(?)", (post_id,))
+    conn = get_shared_connection()
+    with conn:
+        cur = conn.execute("INSERT OR IGNORE INTO seen_posts(post_id) VALUES(?)", (post_id,))
         conn.execute("DELETE FROM pending_posts WHERE post_id = ?", (post_id,))
+    # rowid keeps counting across runs, so it doubles as the maintenance counter
+    if cur.rowcount > 0 and cur.lastrowid % DB_MAINTENANCE_EVERY == 0:
+        _compact_db(conn)
 
 
 def remove_pending_post(post_id: str) -> None:
-    with closing(get_db_connection()) as conn, conn:
+    with get_shared_connection() as conn:
         conn.execute("DELETE FROM pending_posts WHERE post_id = ?", (post_id,))
         logger.info("Removed pending post %s from DB", post_id)
 
 
 def save_pending_post(post_id: str, content: str, img_paths: list[str], video_path: str) -> None:
-    img_paths_json = json.dumps(img_paths if img_paths else [])
-    with closing(get_db_connection()) as conn, conn:
+    img_paths_text = IMG_PATHS_SEP.join(img_paths or [])
+    with get_shared_connection() as conn:
         conn.execute("DELETE FROM pending_posts;")
         conn.execute(
             """
             INSERT INTO pending_posts (post_id, content, img_paths, video_path, attempts, last_attempt)
             VALUES (?, ?, ?, ?, 0, CURRENT_TIMESTAMP)
             """,
-            (post_id, content, img_paths_json, video_path),
+            (post_id, content, img_paths_text, video_path),
         )
 
 
-def _parse_img_paths(img_paths_json: str) -> list[str]:
-    try:
-        return json.loads(img_paths_json) if img_paths_json else []
-    except Exception:
+def _parse_img_paths(img_paths_text: str) -> list[str]:
+    if not img_paths_text:
         return []
+    if img_paths_text.startswith("["):
+        # rows saved before the separator format were JSON arrays
+        try:
+            return json.loads(img_paths_text)
+        except Exception:
+            return []
+    return img_paths_text.split(IMG_PATHS_SEP)
+
+
+def get_pending_posts() -> Iterator[dict]:
+    """Yield retryable pending posts, oldest attempt first."""
+    cur = get_shared_connection().execute(
+        """
+        SELECT post_id, content, img_paths, video_path
+        FROM pending_posts
+        WHERE attempts < 3
+        ORDER BY last_attempt ASC;
+        """
+    )
+    for row in cur:
+        yield {
+            "post_id": row["post_id"],
+            "content": row["content"],
+            "img_paths": _parse_img_paths(row["img_paths"]),
+            "video_path": row["video_path"],
+        }
 
 
-def get_pending_posts() -> list[dict]:
-    with closing(get_db_connection()) as conn:
-        cur = conn.execute(
-            """
-            SELECT post_id, content, img_paths, video_path
-            FROM pending_posts
-            WHERE attempts < 3
-            ORDER BY last_attempt ASC;
-            """
+def get_cached_video_duration(url: str) -> float | None:
+    """Duration saved by a previous yt-dlp extract_info for *url*, if still fresh."""
+    cur = get_shared_connection().execute(
+        "SELECT duration FROM video_meta WHERE url = ? AND fetched_at > datetime('now', ?)",
+        (url, f"-{VIDEO_META_TTL_HOURS} hours"),
+    )
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def cache_video_duration(url: str, duration: float) -> None:
+    with get_shared_connection() as conn:
+        conn.execute("DELETE FROM video_meta WHERE fetched_at <= datetime('now', ?)",
+                     (f"-{VIDEO_META_TTL_HOURS} hours",))
+        conn.execute(
+            "INSERT OR REPLACE INTO video_meta (url, duration, fetched_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+            (url, duration),
         )
-        return [
-            {
-                "post_id": row[0],
-                "content": row[1],
-                "img_paths": _parse_img_paths(row[2]),
-                "video_path": row[3],
-            }
-            for row in cur.fetchall()
-        ]
 
 
 # ---------- utils ----------
 
-def download_media(url: str, filename: str) -> str | None:
-    """Direct (no-proxy) download for public Reddit images."""
+def _save_stream(resp: requests.Response, filename: str) -> int:
+    """Copy a stream=True response body to *filename*; returns bytes written."""
+    resp.raw.decode_content = True  # let urllib3 inflate gzip/deflate bodies
+    with open(filename, "wb") as f:
+        shutil.copyfileobj(resp.raw, f, length=65536)
+        return f.tell()
+
+
+def download_media(
+    url: str, filename: str, *, timeout: float = 30, headers: dict | None = None
+) -> str | None:
+    """
+    Direct (no-proxy) download for public Reddit media.
+    *headers* are merged over the shared session headers for this request only.
+    """
     try:
         if url.startswith('//'):
             url = 'https:' + url
 
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-
         if any(ext in url.lower() for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp']):
             logger.info(f"📥 Downloading image (direct): {url}")
 
-        resp = requests.get(url, stream=True, timeout=30, headers=headers)
+        resp = _http.get(url, stream=True, timeout=timeout, headers=headers)
         resp.raise_for_status()
-
-        total_bytes = 0
-        with open(filename, "wb") as f:
-            for chunk in resp.iter_content(8192):
-                if chunk:
-                    f.write(chunk)
-                    total_bytes += len(chunk)
+        total_bytes = _save_stream(resp, filename)
 
         logger.info(f"✅ Downloaded: {filename} ({total_bytes} bytes)")
         return filename
@@ -196,7 +275,55 @@ def download_media(url: str, filename: str) -> str | None:
         return None
 
 
+def download_images(jobs: list[tuple[int, str]]) -> Iterator[str | None]:
+    """
+    Download (index, url) pairs concurrently into temp_image_<index>.jpg.
+
+    Yields results in the same order as *jobs* (None for failed downloads) as
+    soon as each one is ready, so the caller can upload image N while the
+    remaining downloads are still in flight.
+    """
+    if not jobs:
+        return
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = [
+            pool.submit(download_media, url, f"temp_image_{idx}.jpg") for idx, url in jobs
+        ]
+        for future in futures:
+            yield future.result()
+
+
+def _mux_with_pyav(video_path: str, audio_path: str, output_path: str) -> None:
+    """Copy the video stream and encode the audio to AAC, all in-process via libav."""
+    with av.open(video_path) as vin, av.open(audio_path) as ain, av.open(output_path, "w") as out:
+        v_in = vin.streams.video[0]
+        a_in = ain.streams.audio[0]
+        if hasattr(out, "add_stream_from_template"):  # PyAV >= 14
+            v_out = out.add_stream_from_template(v_in)
+        else:
+            v_out = out.add_stream(template=v_in)
+        a_out = out.add_stream("aac", rate=a_in.rate)
+
+        for packet in vin.demux(v_in):
+            if packet.dts is None:  # demuxer flush packet
+                continue
+            packet.stream = v_out
+            out.mux(packet)
+
+        for frame in ain.decode(a_in):
+            out.mux(a_out.encode(frame))
+        out.mux(a_out.encode(None))
+
+
 def combine_video_audio(video_path: str, audio_path: str, output_path: str) -> str | None:
+    if av is not None:
+        try:
+            _mux_with_pyav(video_path, audio_path, output_path)
+            logger.info("Combined video/audio (PyAV) -> %s", output_path)
+            return output_path
+        except Exception as exc:
+            logger.warning("PyAV mux failed, falling back to ffmpeg: %s", exc)
+
     cmd = [
         "ffmpeg", "-y",
         "-i", video_path,
@@ -237,7 +364,52 @@ def check_rate_limits(api, endpoint):
         logging.error(f"Failed to check rate limits: {e}")
 
 
+_MP4_CONTAINER_ATOMS = {b"moov", b"trak", b"mdia"}
+
+
+def _mp4_handler_types(f, end: int) -> Iterator[bytes]:
+    """Walk MP4 atoms up to *end*, yielding the handler_type of every hdlr atom."""
+    while f.tell() + 8 <= end:
+        start = f.tell()
+        size, kind = struct.unpack(">I4s", f.read(8))
+        header = 8
+        if size == 1:  # 64-bit largesize follows the type
+            size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif size == 0:  # atom runs to the end of its parent
+            size = end - start
+        if size < header:
+            raise ValueError(f"corrupt {kind!r} atom at offset {start}")
+
+        if kind in _MP4_CONTAINER_ATOMS:
+            yield from _mp4_handler_types(f, start + size)
+        elif kind == b"hdlr":
+            f.seek(start + header + 8)  # skip version/flags + pre_defined
+            yield f.read(4)
+        f.seek(start + size)
+
+
+def _has_audio_track(path: str) -> bool | None:
+    """
+    In-process check for an MP4 sound track (a trak whose hdlr is 'soun').
+    Returns None when the file can't be parsed so the caller can fall back to ffprobe.
+    """
+    try:
+        with open(path, "rb") as f:
+            handlers = list(_mp4_handler_types(f, os.fstat(f.fileno()).st_size))
+    except (OSError, ValueError, struct.error) as e:
+        logger.debug("MP4 atom scan failed for %s: %s", path, e)
+        return None
+    if not handlers:
+        return None
+    return b"soun" in handlers
+
+
 def check_audio_stream(video_path: str) -> bool:
+    has_audio = _has_audio_track(video_path)
+    if has_audio is not None:
+        return has_audio
+
     try:
         cmd = [
             "ffprobe",
@@ -293,9 +465,9 @@ def download_reddit_video_ytdlp_auth(
                 "preferedformat": "mp4",
             }],
             "postprocessor_args": ["-c:v", "copy", "-c:a", "aac", "-b:a", "128k"],
-            "quiet": False,
-            "no_warnings": False,
-            "verbose": True,
+            "quiet": True,
+            "no_warnings": True,
+            "verbose": False,
             "prefer_ffmpeg": True,
             "http_headers": {
                 "User-Agent": (
@@ -307,19 +479,26 @@ def download_reddit_video_ytdlp_auth(
         }
 
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            logger.info("Extracting video info…")
-            info = ydl.extract_info(url, download=False)
-            duration = info.get("duration")
-
-            if "formats" in info:
-                logger.info(f"Available formats: {len(info['formats'])}")
-                for fmt in info["formats"][:5]:
-                    has_video = fmt.get('vcodec', 'none') != 'none'
-                    has_audio = fmt.get('acodec', 'none') != 'none'
-                    logger.info(
-                        f"  - {fmt.get('format_id')}: "
-                        f"video={has_video} audio={has_audio} ext={fmt.get('ext')}"
-                    )
+            duration = get_cached_video_duration(url)
+            if duration is not None:
+                logger.info(f"Using cached video duration: {duration}s")
+            else:
+                logger.info("Extracting video info…")
+                info = ydl.extract_info(url, download=False)
+                duration = info.get("duration")
+                if duration is not None:
+                    cache_video_duration(url, duration)
+
+                if "formats" in info and logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Available formats: %d", len(info["formats"]))
+                    for fmt in info["formats"][:5]:
+                        logger.debug(
+                            "  - %s: video=%s audio=%s ext=%s",
+                            fmt.get('format_id'),
+                            fmt.get('vcodec', 'none') != 'none',
+                            fmt.get('acodec', 'none') != 'none',
+                            fmt.get('ext'),
+                        )
 
             if duration and duration > 140:
                 logger.info(f"Video too long: {duration}s > 140s")
@@ -349,6 +528,63 @@ def download_reddit_video_ytdlp_auth(
         return try_manual_audio_merge(url, output_filename)
 
 
+_POST_ID_RE = re.compile(r'/comments/([a-z0-9]+)/')
+
+
+def _probe_audio_url(url: str) -> bool | None:
+    """
+    True if HEAD shows a real audio file, False if it shows an empty
+    placeholder, None if HEAD can't tell (error, non-200, CDN rejecting HEAD).
+    """
+    try:
+        resp = _http.head(url, timeout=10, allow_redirects=True)
+    except Exception as e:
+        logger.debug("HEAD failed %s: %s", url, e)
+        return None
+    if resp.status_code != 200:
+        return None
+    try:
+        return int(resp.headers.get("content-length", "")) > 1000
+    except ValueError:
+        # missing or malformed length: the GET decides
+        return True
+
+
+def _find_audio_urls(audio_urls: list[str]) -> list[str]:
+    """
+    HEAD every candidate audio URL in parallel and return the ones worth a
+    GET: confirmed files first, then those HEAD couldn't judge, each group in
+    priority order. Only 200 responses that are empty placeholders are dropped.
+    """
+    with ThreadPoolExecutor(max_workers=len(audio_urls)) as pool:
+        results = list(pool.map(_probe_audio_url, audio_urls))
+    confirmed = [url for url, ok in zip(audio_urls, results) if ok]
+    unknown = [url for url, ok in zip(audio_urls, results) if ok is None]
+    return confirmed + unknown
+
+
+def _fetch_post_data(json_url: str, proxies: dict | None, verify_ssl: bool) -> dict:
+    """
+    Return the submission's data dict from a /comments/<id>.json listing.
+
+    With ijson the body is parsed while it streams and the connection is
+    dropped as soon as the submission has been read, so the comment tree that
+    follows it is never downloaded or decoded.
+    """
+    with _http.get(
+        json_url,
+        proxies=proxies,
+        verify=verify_ssl,
+        timeout=15,
+        stream=ijson is not None,
+    ) as response:
+        response.raise_for_status()
+        if ijson is None:
+            return _json_loads(response.content)[0]['data']['children'][0]['data']
+        response.raw.decode_content = True
+        return next(ijson.items(response.raw, 'item.data.children.item.data'))
+
+
 def try_manual_audio_merge(
     post_url: str, video_file: str
 ) -> tuple[str | None, int | None, str | None]:
@@ -360,7 +596,7 @@ def try_manual_audio_merge(
     try:
         logger.info("Attempting manual audio merge…")
 
-        match = re.search(r'/comments/([a-z0-9]+)/', post_url)
+        match = _POST_ID_RE.search(post_url)
         if not match:
             logger.error("Invalid post URL")
             return None, None, "invalid_post_url"
@@ -378,24 +614,11 @@ def try_manual_audio_merge(
         else:
             logger.warning("All proxies offline – fetching Reddit JSON directly")
 
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-
         # Fetch post JSON
         try:
             json_url = f"https://www.reddit.com/comments/{post_id}.json"
             logger.info(f"Fetching post JSON: {json_url}")
-            response = requests.get(
-                json_url,
-                headers=headers,
-                proxies=proxies,
-                verify=verify_ssl,
-                timeout=15,
-            )
-            response.raise_for_status()
-            json_data = response.json()
-            post_data = json_data[0]['data']['children'][0]['data']
+            post_data = _fetch_post_data(json_url, proxies, verify_ssl)
 
         except Exception as e:
             logger.error(f"Error fetching post JSON: {e}")
@@ -405,11 +628,13 @@ def try_manual_audio_merge(
                 return None, None, "proxy_endpoint_not_supported_fatal"
             return None, None, "json_fetch_failed"
 
-        if 'media' not in post_data or 'reddit_video' not in post_data.get('media', {}):
+        # "media" is null (not missing) on non-video posts, hence the `or {}`
+        reddit_video = (post_data.get('media') or {}).get('reddit_video')
+        if not reddit_video:
             logger.error("Post has no video metadata")
             return None, None, "no_video_metadata"
 
-        fallback_url = post_data['media']['reddit_video'].get('fallback_url', '')
+        fallback_url = reddit_video.get('fallback_url', '')
         if not fallback_url:
             logger.error("No fallback_url found")
             return None, None, "no_fallback_url"
@@ -419,15 +644,10 @@ def try_manual_audio_merge(
         # Download video if not already on disk
         if not os.path.exists(video_file):
             logger.info("Downloading video from fallback_url…")
-            resp = requests.get(
-                fallback_url,
-                timeout=60,
-                headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'},
-            )
-            resp.raise_for_status()
-            with open(video_file, 'wb') as f:
-                f.write(resp.content)
-            logger.info(f"Video downloaded: {len(resp.content)} bytes")
+            with _http.get(fallback_url, timeout=60, stream=True) as resp:
+                resp.raise_for_status()
+                size = _save_stream(resp, video_file)
+            logger.info(f"Video downloaded: {size} bytes")
 
         # Try audio URLs (CMAF first, then legacy DASH)
         base_url = fallback_url.rsplit('/', 1)[0]
@@ -441,23 +661,19 @@ def try_manual_audio_merge(
         ]
 
         audio_file = None
-        for audio_url in audio_urls:
+        for audio_url in _find_audio_urls(audio_urls):
             try:
                 logger.info(f"Trying audio: {audio_url}")
-                resp = requests.get(
-                    audio_url,
-                    timeout=30,
-                    headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'},
-                )
-                if resp.status_code == 200 and len(resp.content) > 1000:
+                with _http.get(audio_url, timeout=30, stream=True) as resp:
+                    if resp.status_code != 200:
+                        continue
+                    size = _save_stream(resp, "temp_audio.mp4")
+                if size > 1000:
                     audio_file = "temp_audio.mp4"
-                    with open(audio_file, 'wb') as f:
-                        f.write(resp.content)
-                    logger.info(f"✓ Audio downloaded: {len(resp.content)} bytes")
+                    logger.info(f"✓ Audio downloaded: {size} bytes")
                     break
             except Exception as e:
-                logger.debug(f"Failed {audio_url}: {e}")
-                continue
+                logger.debug("Failed %s: %s", audio_url, e)
 
         if not audio_file:
             logger.error("Could not find audio stream at any URL")
@@ -478,11 +694,7 @@ def try_manual_audio_merge(
             pass
 
         if result and os.path.exists(output_file):
-            try:
-                os.remove(video_file)
-            except Exception:
-                pass
-            os.rename(output_file, video_file)
+            os.replace(output_file, video_file)
             logger.info("✓ Manual audio merge successful!")
             return video_file, None, None
         else:
@@ -496,6 +708,24 @@ def try_manual_audio_merge(
 
 # ---------- Twitter logic ----------
 
+_FATAL_TWEEPY_RE = re.compile(
+    r"not allowed to post a video longer|your media ids are invalid|media id is invalid"
+    r"|unsupported|file type not supported|duration|too long|invalid media"
+    r"|video too long|403 forbidden"
+)
+
+
+_FATAL_DOWNLOAD_RE = re.compile("|".join(map(re.escape, [
+    "copyright", "404", "forbidden", "not permitted", "unavailable",
+    "audio_not_found_fatal", "no_video_metadata", "invalid_post_url",
+    "proxy_endpoint_not_supported_fatal", "bad_endpoint",
+])))
+
+
+def _has_fatal_marker(msg: str) -> bool:
+    return _FATAL_TWEEPY_RE.search(msg.lower()) is not None
+
+
 def _is_unrecoverable_tweepy_error(exc: tweepy.TweepyException) -> bool:
     resp = getattr(exc, "response", None)
     if resp is not None:
@@ -506,36 +736,10 @@ def _is_unrecoverable_tweepy_error(exc: tweepy.TweepyException) -> bool:
                 msg = str(data)
             except Exception:
                 msg = resp.text or ""
-            msg_lower = msg.lower()
-            fatal_markers = [
-                "not allowed to post a video longer",
-                "your media ids are invalid",
-                "media id is invalid",
-                "unsupported",
-                "file type not supported",
-                "duration",
-                "too long",
-                "invalid media",
-                "video too long",
-                "403 forbidden",
-            ]
-            if any(m in msg_lower for m in fatal_markers):
+            if _has_fatal_marker(msg):
                 return True
 
-    msg = str(exc).lower()
-    fatal_markers = [
-        "not allowed to post a video longer",
-        "your media ids are invalid",
-        "media id is invalid",
-        "unsupported",
-        "file type not supported",
-        "duration",
-        "too long",
-        "invalid media",
-        "video too long",
-        "403 forbidden",
-    ]
-    return any(m in msg for m in fatal_markers)
+    return _has_fatal_marker(str(exc))
 
 
 def post_to_twitter(
@@ -571,12 +775,7 @@ def post_to_twitter(
 
             if filename is None:
                 logger.error(f"Download failed for {video_path}: {err}")
-                fatal_errors = [
-                    "copyright", "404", "forbidden", "not permitted", "unavailable",
-                    "audio_not_found_fatal", "no_video_metadata", "invalid_post_url",
-                    "proxy_endpoint_not_supported_fatal", "bad_endpoint",
-                ]
-                if err and any(k in err.lower() for k in fatal_errors):
+                if err and _FATAL_DOWNLOAD_RE.search(err.lower()):
                     if post_id:
                         remove_pending_post(post_id)
                     return False, True
@@ -605,6 +804,7 @@ def post_to_twitter(
         elif img_paths:
             logger.info(f"📸 Downloading {len(img_paths)} image(s) (direct connection)…")
             downloaded_count = 0
+            jobs: list[tuple[int, str]] = []
             for idx, url in enumerate(img_paths[:4]):
                 if not url or not url.strip():
                     logger.warning(f"⚠️ Image {idx+1}: empty URL, skipping")
@@ -615,7 +815,9 @@ def post_to_twitter(
                     logger.warning(f"⚠️ Image {idx+1}: invalid URL ({url[:50]}…), skipping")
                     continue
                 logger.info(f"📥 Downloading image {idx+1}/{len(img_paths[:4])}: {url[:80]}…")
-                local = download_media(url, f"temp_image_{idx}.jpg")
+                jobs.append((idx, url))
+
+            for (idx, _), local in zip(jobs, download_images(jobs)):
                 if local:
                     try:
                         check_rate_limits(api, "/media/upload")
@@ -666,11 +868,13 @@ def post_to_twitter(
 
 # ---------- Orchestration ----------
 
+_SURROGATE_RE = re.compile("[\ud800-\udfff]")
+
+
 def process_posts() -> None:
-    pending = get_pending_posts()
+    p = next(get_pending_posts(), None)
 
-    if pending:
-        p = pending[0]
+    if p:
         success, fatal = post_to_twitter(
             p["content"], p["img_paths"], p["video_path"], post_id=p["post_id"]
         )
@@ -704,7 +908,7 @@ def process_posts() -> None:
 
         img_paths = [url for url in img_paths if url and url.strip()]
 
-        if img_paths:
+        if img_paths and logger.isEnabledFor(logging.INFO):
             logger.info("📋 Image URLs to download:")
             for i, url in enumerate(img_paths, 1):
                 logger.info(f"   {i}. {url[:80]}…")
@@ -727,9 +931,10 @@ def process_posts() -> None:
         else:
             content = (post_content or post_url)[:280]
 
-        content = (
-            content.encode("utf-8", errors="replace").decode("utf-8") if content else ""
-        )
+        # Lone surrogates would make the tweet payload unencodable; only pay for
+        # the encode/decode round-trip when one is actually present.
+        if content and _SURROGATE_RE.search(content):
+            content = content.encode("utf-8", errors="replace").decode("utf-8")
 
         success, fatal = post_to_twitter(
             content, img_paths, video_path, post_id=post["id"]
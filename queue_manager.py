@@ -1,240 +1,281 @@
-import sqlite3
 import json
 import logging
-from contextlib import closing
 from datetime import datetime
 
+from database import get_shared_connection
+
+# orjson (opcional): serialização dos posts mais rápida; json é o fallback
+try:
+    import orjson
+    _json_dumps = lambda obj: orjson.dumps(obj).decode()
+    _json_loads = orjson.loads
+except Exception:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
-DB_PATH = "seen_posts.db"
 MAX_JSON_BATCHES = 2  # Máximo de JSONs armazenados
 
 def initialize_queue_db():
     """Inicializa tabelas para sistema de fila otimizado"""
-    with closing(sqlite3.connect(DB_PATH)) as conn:
-        # Tabela de batches de JSON (máximo 2)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS json_batches (
-                batch_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                subreddit TEXT,
-                fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                posts_json TEXT,
-                total_posts INTEGER,
-                remaining_posts INTEGER
-            )
-        """)
-        
-        # Tabela de posts já vistos (permanente)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS seen_posts (
-                post_id TEXT PRIMARY KEY,
-                posted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Tabela de pending (retry)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS pending_posts (
-                post_id TEXT PRIMARY KEY,
-                content TEXT,
-                img_paths TEXT,
-                video_path TEXT,
-                attempts INTEGER DEFAULT 0,
-                last_attempt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        conn.commit()
-        logger.info("✓ Banco de dados inicializado")
+    conn = get_shared_connection()
+    # Tabela de batches de JSON (máximo 2)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS json_batches (
+            batch_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            subreddit TEXT,
+            fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            posts_json TEXT,
+            total_posts INTEGER,
+            remaining_posts INTEGER
+        )
+    """)
+    
+    # FIFO (remoção e estatísticas) percorre o índice em vez de ordenar a tabela
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_batches_fetched
+        ON json_batches (fetched_at)
+    """)
+    
+    # Um registro por post de cada batch; só o payload do post escolhido é decodificado
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS batch_posts (
+            batch_id INTEGER,
+            ord INTEGER,
+            post_id TEXT,
+            payload TEXT,
+            PRIMARY KEY (batch_id, ord)
+        )
+    """)
+    # Índice da antiga coluna seen: só seen_posts decide se um post já saiu
+    conn.execute("DROP INDEX IF EXISTS idx_batch_posts_next")
+    
+    # Tabela de posts já vistos (permanente)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS seen_posts (
+            post_id TEXT PRIMARY KEY,
+            posted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Tabela de pending (retry)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pending_posts (
+            post_id TEXT PRIMARY KEY,
+            content TEXT,
+            img_paths TEXT,
+            video_path TEXT,
+            attempts INTEGER DEFAULT 0,
+            last_attempt TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    _migrate_json_blobs(conn)
+    
+    conn.commit()
+    logger.info("✓ Banco de dados inicializado")
+
+def _insert_batch_posts(conn, batch_id, posts):
+    conn.executemany("""
+        INSERT INTO batch_posts (batch_id, ord, post_id, payload)
+        VALUES (?, ?, ?, ?)
+    """, [(batch_id, i, post['id'], _json_dumps(post)) for i, post in enumerate(posts)])
+
+def _migrate_json_blobs(conn):
+    """Converte batches antigos (posts_json inteiro numa coluna) para batch_posts"""
+    cursor = conn.execute(
+        "SELECT batch_id, posts_json FROM json_batches WHERE posts_json IS NOT NULL"
+    )
+    for row in cursor.fetchall():
+        _insert_batch_posts(conn, row['batch_id'], _json_loads(row['posts_json']))
+        conn.execute("UPDATE json_batches SET posts_json = NULL WHERE batch_id = ?", (row['batch_id'],))
+        logger.info(f"🔄 Batch #{row['batch_id']} migrado para batch_posts")
+
+def _delete_batches(conn, where, params=()):
+    """Remove batches (e seus posts) que satisfazem a condição WHERE; retorna quantos"""
+    conn.execute(
+        f"DELETE FROM batch_posts WHERE batch_id IN (SELECT batch_id FROM json_batches WHERE {where})",
+        params,
+    )
+    return conn.execute(f"DELETE FROM json_batches WHERE {where}", params).rowcount
 
 def add_json_batch(posts, subreddit):
     """
     Adiciona um novo batch de posts (JSON completo).
     Se já existem 2 batches, remove o mais antigo (FIFO).
-    Retorna batch_id criado.
+    Retorna (batch_id criado, resumo da fila após a inserção).
     """
-    with closing(sqlite3.connect(DB_PATH)) as conn:
-        # Conta quantos batches existem
-        cursor = conn.execute("SELECT COUNT(*) FROM json_batches")
-        count = cursor.fetchone()[0]
-        
-        # Se já tem 2 ou mais, remove o mais antigo
-        if count >= MAX_JSON_BATCHES:
-            cursor = conn.execute("""
-                SELECT batch_id FROM json_batches 
-                ORDER BY fetched_at ASC 
-                LIMIT ?
-            """, (count - MAX_JSON_BATCHES + 1,))
-            
-            old_batches = [row[0] for row in cursor.fetchall()]
-            
-            for old_id in old_batches:
-                conn.execute("DELETE FROM json_batches WHERE batch_id = ?", (old_id,))
-                logger.info(f"🗑️ Batch antigo #{old_id} removido (FIFO - mantendo apenas {MAX_JSON_BATCHES})")
-        
-        # Serializa posts para JSON
-        posts_json = json.dumps(posts)
+    conn = get_shared_connection()
+    # Uma única transação: remoção FIFO + cabeçalho + todos os posts
+    with conn:
+        # Mantém os MAX_JSON_BATCHES - 1 mais recentes (OFFSET) e remove o resto,
+        # abrindo espaço para o batch novo
+        removed = _delete_batches(conn, """batch_id IN (
+            SELECT batch_id FROM json_batches
+            ORDER BY fetched_at DESC, batch_id DESC
+            LIMIT -1 OFFSET ?
+        )""", (MAX_JSON_BATCHES - 1,))
+        if removed:
+            logger.info(f"🗑️ {removed} batch(es) antigo(s) removido(s) (FIFO - mantendo apenas {MAX_JSON_BATCHES})")
+    
         total = len(posts)
-        
-        # Insere novo batch
+    
+        # Insere novo batch (cabeçalho) e um registro por post
         cursor = conn.execute("""
-            INSERT INTO json_batches (subreddit, posts_json, total_posts, remaining_posts)
-            VALUES (?, ?, ?, ?)
-        """, (subreddit, posts_json, total, total))
-        
+            INSERT INTO json_batches (subreddit, total_posts, remaining_posts)
+            VALUES (?, ?, ?)
+        """, (subreddit, total, total))
+    
         batch_id = cursor.lastrowid
-        conn.commit()
-        
-        logger.info(f"✅ Novo batch #{batch_id} adicionado: {total} posts de r/{subreddit}")
+        _insert_batch_posts(conn, batch_id, posts)
         
-        return batch_id
+        # Resumo na mesma transação, dispensa um get_queue_stats() completo
+        cursor = conn.execute("SELECT COUNT(*), COALESCE(SUM(remaining_posts), 0) FROM json_batches")
+        batches_count, available_posts = cursor.fetchone()
+    
+    logger.info(f"✅ Novo batch #{batch_id} adicionado: {total} posts de r/{subreddit}")
+    
+    return batch_id, {'batches_count': batches_count, 'available_posts': available_posts}
 
 def get_next_unposted_post():
     """
-    Varre TODOS os batches disponíveis procurando um post não visto.
+    Busca o próximo post não visto em TODOS os batches disponíveis.
     Retorna (batch_id, post) ou (None, None) se não houver posts novos.
     
     Estratégia:
-    1. Pega batch mais ANTIGO primeiro (FIFO)
-    2. Varre todos os posts do batch
-    3. Encontra primeiro não visto
-    4. Se batch esgotou, remove ele
-    5. Passa para próximo batch
+    1. Uma única consulta em batch_posts, batch mais ANTIGO primeiro (FIFO)
+    2. Ignora posts já postados (seen_posts); nada é marcado aqui, então um
+       post entregue mas não tuitado (execução interrompida) volta na próxima
+    3. Só o payload do post escolhido é decodificado
+    4. Batches anteriores ao escolhido não têm posts novos e são removidos
     """
-    with closing(sqlite3.connect(DB_PATH)) as conn:
-        conn.row_factory = sqlite3.Row
-        
-        # Busca batches do mais ANTIGO para o mais NOVO (FIFO)
-        cursor = conn.execute("""
-            SELECT batch_id, subreddit, posts_json, total_posts, remaining_posts, fetched_at
-            FROM json_batches
-            ORDER BY fetched_at ASC
-        """)
-        
-        batches = cursor.fetchall()
-        
-        if not batches:
-            logger.warning("📭 Nenhum JSON disponível no banco de dados")
-            return None, None
-        
-        logger.info(f"🔍 Verificando {len(batches)} batch(es) disponível(is)...")
-        
-        # Varre cada batch
-        for batch in batches:
-            batch_id = batch['batch_id']
-            subreddit = batch['subreddit']
-            posts = json.loads(batch['posts_json'])
-            total = batch['total_posts']
-            remaining = batch['remaining_posts']
-            
-            logger.info(f"📂 Batch #{batch_id} (r/{subreddit}): {remaining}/{total} posts restantes")
-            
-            # Varre TODOS os posts deste batch
-            found_new = False
-            for post in posts:
-                post_id = post['id']
-                
-                # Verifica se já foi visto
-                cursor = conn.execute(
-                    "SELECT 1 FROM seen_posts WHERE post_id = ?", 
-                    (post_id,)
-                )
-                
-                if cursor.fetchone() is None:
-                    # Post NOVO encontrado!
-                    logger.info(f"✨ Post novo encontrado no batch #{batch_id}: {post.get('title', 'N/A')[:50]}...")
-                    
-                    # Atualiza remaining_posts
-                    new_remaining = remaining - 1
-                    conn.execute("""
-                        UPDATE json_batches 
-                        SET remaining_posts = ? 
-                        WHERE batch_id = ?
-                    """, (new_remaining, batch_id))
-                    conn.commit()
-                    
-                    # Se batch esgotou, remove
-                    if new_remaining <= 0:
-                        conn.execute("DELETE FROM json_batches WHERE batch_id = ?", (batch_id,))
-                        conn.commit()
-                        logger.info(f"🗑️ Batch #{batch_id} esgotado e removido do banco")
-                    
-                    return batch_id, post
-            
-            # Se chegou aqui, todos os posts deste batch já foram vistos
-            logger.warning(f"⚠️ Batch #{batch_id} não tem posts novos (todos já postados)")
-            
-            # Remove batch sem posts novos
-            conn.execute("DELETE FROM json_batches WHERE batch_id = ?", (batch_id,))
-            conn.commit()
-            logger.info(f"🗑️ Batch #{batch_id} removido (sem posts novos)")
-        
-        # Se chegou aqui, todos os batches foram verificados e nenhum tem post novo
+    conn = get_shared_connection()
+    
+    cursor = conn.execute("SELECT COUNT(*) FROM json_batches")
+    batches_count = cursor.fetchone()[0]
+    
+    if not batches_count:
+        logger.warning("📭 Nenhum JSON disponível no banco de dados")
+        return None, None
+    
+    logger.info(f"🔍 Verificando {batches_count} batch(es) disponível(is)...")
+    
+    cursor = conn.execute("""
+        SELECT bp.batch_id, bp.ord, bp.payload, b.subreddit, b.total_posts, b.remaining_posts
+        FROM batch_posts bp
+        JOIN json_batches b ON b.batch_id = bp.batch_id
+        WHERE NOT EXISTS (SELECT 1 FROM seen_posts s WHERE s.post_id = bp.post_id)
+        ORDER BY bp.batch_id, bp.ord
+        LIMIT 1
+    """)
+    row = cursor.fetchone()
+    
+    if row is None:
+        # Todos os batches foram verificados e nenhum tem post novo
+        _delete_batches(conn, "1")
+        conn.commit()
+        logger.info(f"🗑️ {batches_count} batch(es) removido(s) (sem posts novos)")
         logger.error("❌ Nenhum post novo encontrado em NENHUM batch!")
         logger.error("   Todos os posts disponíveis já foram postados.")
         return None, None
+    
+    batch_id = row['batch_id']
+    post = _json_loads(row['payload'])
+    
+    # Batches mais antigos que este não têm mais posts novos
+    cursor = conn.execute("SELECT COUNT(*) FROM json_batches WHERE batch_id < ?", (batch_id,))
+    exhausted = cursor.fetchone()[0]
+    if exhausted:
+        _delete_batches(conn, "batch_id < ?", (batch_id,))
+        logger.warning(f"⚠️ {exhausted} batch(es) sem posts novos removido(s)")
+    
+    logger.info(f"📂 Batch #{batch_id} (r/{row['subreddit']}): {row['remaining_posts']}/{row['total_posts']} posts restantes")
+    logger.info(f"✨ Post novo encontrado no batch #{batch_id}: {post.get('title', 'N/A')[:50]}...")
+    
+    # Atualiza remaining_posts; o batch esgotado só sai quando todos os seus
+    # posts estiverem em seen_posts (passos 4 e "nenhum post novo" acima)
+    new_remaining = max(row['remaining_posts'] - 1, 0)
+    conn.execute("""
+        UPDATE json_batches 
+        SET remaining_posts = ? 
+        WHERE batch_id = ?
+    """, (new_remaining, batch_id))
+    
+    conn.commit()
+    return batch_id, post
 
 def get_queue_stats():
     """Retorna estatísticas detalhadas da fila"""
-    with closing(sqlite3.connect(DB_PATH)) as conn:
-        # Total de batches
-        cursor = conn.execute("SELECT COUNT(*) FROM json_batches")
-        total_batches = cursor.fetchone()[0]
-        
-        # Total de posts disponíveis (remaining)
-        cursor = conn.execute("SELECT SUM(remaining_posts) FROM json_batches")
-        result = cursor.fetchone()[0]
-        total_available = result if result else 0
-        
-        # Total de posts já postados
-        cursor = conn.execute("SELECT COUNT(*) FROM seen_posts")
-        total_posted = cursor.fetchone()[0]
-        
-        # Detalhes de cada batch
-        cursor = conn.execute("""
-            SELECT batch_id, subreddit, total_posts, remaining_posts, fetched_at
-            FROM json_batches
-            ORDER BY fetched_at ASC
-        """)
-        
-        batches_detail = []
-        for row in cursor.fetchall():
-            batches_detail.append({
-                'batch_id': row[0],
-                'subreddit': row[1],
-                'total': row[2],
-                'remaining': row[3],
-                'age': row[4]
-            })
-        
-        return {
-            'batches_count': total_batches,
-            'available_posts': total_available,
-            'posted_total': total_posted,
-            'batches': batches_detail
-        }
+    conn = get_shared_connection()
+    # Total de batches
+    cursor = conn.execute("SELECT COUNT(*) FROM json_batches")
+    total_batches = cursor.fetchone()[0]
+    
+    # Total de posts disponíveis (remaining)
+    cursor = conn.execute("SELECT SUM(remaining_posts) FROM json_batches")
+    result = cursor.fetchone()[0]
+    total_available = result if result else 0
+    
+    # Total de posts já postados
+    cursor = conn.execute("SELECT COUNT(*) FROM seen_posts")
+    total_posted = cursor.fetchone()[0]
+    
+    # Detalhes de cada batch
+    cursor = conn.execute("""
+        SELECT batch_id, subreddit, total_posts, remaining_posts, fetched_at
+        FROM json_batches
+        ORDER BY fetched_at ASC, batch_id ASC
+    """)
+    
+    batches_detail = []
+    for row in cursor.fetchall():
+        batches_detail.append({
+            'batch_id': row[0],
+            'subreddit': row[1],
+            'total': row[2],
+            'remaining': row[3],
+            'age': row[4]
+        })
+    
+    return {
+        'batches_count': total_batches,
+        'available_posts': total_available,
+        'posted_total': total_posted,
+        'batches': batches_detail
+    }
+
+def get_remaining_by_subreddit():
+    """Retorna {subreddit: posts restantes} somando os batches armazenados"""
+    conn = get_shared_connection()
+    cursor = conn.execute("""
+        SELECT subreddit, SUM(remaining_posts)
+        FROM json_batches
+        GROUP BY subreddit
+    """)
+    return {row[0]: row[1] for row in cursor.fetchall()}
 
 def is_post_seen(post_id):
     """Verifica se post já foi visto"""
-    with closing(sqlite3.connect(DB_PATH)) as conn:
-        cursor = conn.execute("SELECT 1 FROM seen_posts WHERE post_id = ?", (post_id,))
-        return cursor.fetchone() is not None
+    conn = get_shared_connection()
+    cursor = conn.execute("SELECT 1 FROM seen_posts WHERE post_id = ?", (post_id,))
+    return cursor.fetchone() is not None
 
 def mark_post_as_seen(post_id):
     """Marca post como visto"""
-    with closing(sqlite3.connect(DB_PATH)) as conn:
-        conn.execute(
-            "INSERT OR IGNORE INTO seen_posts (post_id) VALUES (?)", 
-            (post_id,)
-        )
-        conn.commit()
+    conn = get_shared_connection()
+    conn.execute(
+        "INSERT OR IGNORE INTO seen_posts (post_id) VALUES (?)", 
+        (post_id,)
+    )
+    conn.commit()
 
 def clear_all_batches():
     """Remove todos os batches (útil para reset/debug)"""
-    with closing(sqlite3.connect(DB_PATH)) as conn:
-        conn.execute("DELETE FROM json_batches")
-        conn.commit()
-        logger.info("🗑️ Todos os batches foram removidos")
+    conn = get_shared_connection()
+    _delete_batches(conn, "1")
+    conn.commit()
+    logger.info("🗑️ Todos os batches foram removidos")
 
 if __name__ == "__main__":
     # Teste
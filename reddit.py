@@ -1,20 +1,100 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 import os
 import re
-from random import choice
-from bs4 import BeautifulSoup
+import threading
+from random import shuffle
+from itertools import islice
+from functools import lru_cache
+from dataclasses import dataclass, field, asdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import lxml.html
+from lxml import etree
 from queue_manager import (
     initialize_queue_db,
     add_json_batch,
     get_next_unposted_post,
     get_queue_stats,
+    get_remaining_by_subreddit,
     MAX_JSON_BATCHES
 )
-from proxy_manager import get_available_proxy, get_requests_proxies
+from proxy_manager import (
+    CONNECT_TIMEOUT,
+    confirm_proxy,
+    get_available_proxy,
+    get_requests_proxies,
+    peek_available_proxy,
+    report_proxy_failure,
+)
+from database import get_seen_subset
 
 logger = logging.getLogger(__name__)
 
+SUBREDDITS = ('Overwatch', 'Overwatch_Memes')
+
+# old.reddit (div.thing) pages are scraped first by default; set
+# USE_LEGACY_OLD_REDDIT=0 to use only new reddit (shreddit-post) pages and
+# skip the legacy parsing branch entirely
+USE_LEGACY_OLD_REDDIT = os.getenv('USE_LEGACY_OLD_REDDIT', '1') == '1'
+
+
+def _listing_urls(subreddit):
+    new_reddit = (
+        f"https://www.reddit.com/r/{subreddit}/",
+        f"https://www.reddit.com/r/{subreddit}/hot/",
+    )
+    if not USE_LEGACY_OLD_REDDIT:
+        return new_reddit
+    return (
+        f"https://old.reddit.com/r/{subreddit}/",
+        f"https://old.reddit.com/r/{subreddit}/hot/",
+    ) + new_reddit
+
+
+_HOMEPAGE_URL = "https://old.reddit.com/" if USE_LEGACY_OLD_REDDIT else "https://www.reddit.com/"
+
+# Built once; fetch_posts_from_reddit_html only formats URLs for unknown subreddits
+_LISTING_URLS = {subreddit: _listing_urls(subreddit) for subreddit in SUBREDDITS}
+
+
+# ---------------------------------------------------------------------------
+# HTTP session — one pooled session per process so the TCP/TLS connection to
+# Reddit (or the proxy) is reused across requests and calls.
+# ---------------------------------------------------------------------------
+
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'User-Agent': (
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+        'AppleWebKit/537.36 (KHTML, like Gecko) '
+        'Chrome/131.0.0.0 Safari/537.36'
+    ),
+    'Accept': (
+        'text/html,application/xhtml+xml,application/xml;'
+        'q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8'
+    ),
+    'Accept-Language': 'en-US,en;q=0.9,pt-BR;q=0.8,pt;q=0.7',
+    'Accept-Encoding': 'gzip, deflate, br, zstd',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+    'sec-ch-ua': '"Google Chrome";v="131", "Chromium";v="131", "Not_A Brand";v="24"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"Windows"',
+    'Cache-Control': 'max-age=0',
+})
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=[502, 503, 504]),
+))
+
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -29,9 +109,17 @@ def check_proxy_available() -> bool:
     return proxy is not None
 
 
+def _unamp(url):
+    """Undo HTML-escaped '&amp;' in a URL; most URLs have none, so skip the copy."""
+    return url.replace('&amp;', '&') if '&amp;' in url else url
+
+
+_POST_ID_RE = re.compile(r'/comments/([a-z0-9]+)/')
+
+
 def extract_post_id_from_url(url):
     """Extrai o ID do post da URL do Reddit"""
-    match = re.search(r'/comments/([a-z0-9]+)/', url)
+    match = _POST_ID_RE.search(url)
     return match.group(1) if match else None
 
 
@@ -39,202 +127,354 @@ def extract_post_id_from_url(url):
 # HTML parsing
 # ---------------------------------------------------------------------------
 
-def parse_reddit_html(html_content):
-    soup = BeautifulSoup(html_content, 'lxml')
-    posts = []
-    filtered_count = 0
+@dataclass(slots=True)
+class PostInfo:
+    id: str = ''
+    title: str = ''
+    content: str = ''
+    url: str = ''
+    s_img: str = ''
+    m_img: list = field(default_factory=list)
+    video: str = ''
+    video_fallback_url: str = ''
+
+
+# A redd.it image link: domain and file extension checked in one scan
+_IMG_URL_RE = re.compile(r'redd\.it/[^?#]*\.(?:jpe?g|png|gif|webp)', re.IGNORECASE)
+# Post URLs are always absolute permalinks on one of these hosts
+_ALLOWED_URL_PREFIXES = tuple(
+    f"https://{host}/r/{subreddit}/"
+    for host in ('www.reddit.com', 'old.reddit.com')
+    for subreddit in SUBREDDITS
+)
 
-    post_elements = soup.find_all('shreddit-post')
 
-    if not post_elements:
-        post_elements = soup.find_all('div', {'data-context': 'listing'})
+@lru_cache(maxsize=None)
+def _class_xpath(tag, cls):
+    """Compiled XPath for descendant <tag> elements whose class list contains *cls*."""
+    return etree.XPath(f'.//{tag}[contains(concat(" ", normalize-space(@class), " "), " {cls} ")]')
 
-    if not post_elements:
-        post_elements = soup.find_all('div', class_=lambda x: x and 'thing' in x)
 
-    logger.info(f"🔍 Encontrados {len(post_elements)} elementos de post no HTML")
+def _find_by_class(elem, tag, cls):
+    found = _class_xpath(tag, cls)(elem)
+    return found[0] if found else None
 
-    for post_elem in post_elements:
-        try:
-            post_info = extract_post_data(post_elem, soup)
-            if post_info and post_info.get('id'):
-                posts.append(post_info)
+
+# Every candidate post element in a single walk of the tree
+_POST_XPATH = etree.XPath(
+    '//*[self::shreddit-post'
+    ' or self::div[@data-context="listing" or contains(@class, "thing")]]'
+)
+
+
+def _select_post_elements(root):
+    """
+    shreddit-post elements if there are any, else listing divs, else "thing"
+    divs: the same priority as separate queries, from one pass over the tree.
+    """
+    shreddit, listing, thing = [], [], []
+    for elem in _POST_XPATH(root):
+        if elem.tag == 'shreddit-post':
+            shreddit.append(elem)
+        elif elem.get('data-context') == 'listing':
+            listing.append(elem)
+        else:
+            thing.append(elem)
+    post_elements = shreddit or listing or thing
+    logger.info("🔍 Encontrados %s elementos de post no HTML", len(post_elements))
+    return post_elements
+
+
+def _text(elem):
+    # same result as bs4's get_text(strip=True): every text piece stripped, then joined
+    return ''.join(piece.strip() for piece in elem.itertext())
+
+
+def _element_post_id(post_elem):
+    if post_elem.tag == 'shreddit-post':
+        return post_elem.get('id', '').replace('t3_', '')
+    post_id = post_elem.get('data-fullname', '').replace('t3_', '')
+    if not post_id:
+        post_id = post_elem.get('id', '').replace('thing_t3_', '')
+    return post_id
+
+
+def _slice_listing(html_content):
+    """
+    Cut an old.reddit page (bytes) down to its #siteTable listing before parsing.
+
+    Header, sidebar and inline scripts come first on those pages and hold no
+    posts, so skipping them shrinks the tree lxml has to build. New reddit
+    pages have no siteTable and are returned untouched.
+    """
+    pos = html_content.find(b'id="siteTable"')
+    start = html_content.rfind(b'<', 0, pos) if pos != -1 else -1
+    return html_content[start:] if start != -1 else html_content
+
+
+_STREAM_CHUNK = 64 * 1024
+_SLICE_SCAN_LIMIT = 512 * 1024  # bytes buffered while looking for #siteTable
+
+
+def _parse_stream(chunks, stop=None):
+    """
+    Feed a streamed page to lxml chunk by chunk, so parsing overlaps the
+    download and the body is never held as one bytes object.
+
+    Like _slice_listing, everything before old.reddit's #siteTable is
+    skipped; a page without the marker in its first _SLICE_SCAN_LIMIT bytes
+    is fed whole. Returns (root element, bytes received); the root is None
+    when *stop* was set before the page finished.
+    """
+    # Reddit always serves UTF-8; without it libxml2 guesses Latin-1 for a sliced page.
+    # Feed parsers are stateful, so one per page.
+    parser = lxml.html.HTMLParser(encoding='utf-8')
+    head = bytearray()
+    received = 0
+    for chunk in chunks:
+        if stop is not None and stop.is_set():
+            return None, received
+        received += len(chunk)
+        if head is None:
+            parser.feed(chunk)
+            continue
+        head += chunk
+        data = bytes(head)
+        sliced = _slice_listing(data)
+        if sliced is data and len(data) < _SLICE_SCAN_LIMIT:
+            continue
+        parser.feed(sliced)
+        head = None
+    if head:
+        parser.feed(bytes(head))
+    return parser.close(), received
+
+
+def _iter_post_elements(post_elements):
+    filtered_count = 0
+
+    # Stickied, promoted and already-posted elements are dropped before any
+    # extraction work; the seen ids for the whole page come from a single IN (...) query.
+    candidates = []
+    for elem in post_elements:
+        if elem.get('data-stickied') == 'true' or elem.get('stickied') == 'true':
+            continue
+        if '/user/' in (elem.get('permalink') or elem.get('data-permalink') or ''):
+            filtered_count += 1
+            continue
+        candidates.append(elem)
+    post_elements = candidates
+    post_ids = [_element_post_id(elem) for elem in post_elements]
+    seen = get_seen_subset(filter(None, post_ids))
+    if seen:
+        logger.info("⏭️  %s already-posted post(s) skipped", len(seen))
+
+    try:
+        for post_elem, post_id in zip(post_elements, post_ids):
+            if post_id in seen:
+                continue
+            try:
+                post_info = extract_post_data(post_elem)
+            except Exception as e:
+                logger.debug("Erro ao processar post: %s", e)
+                continue
+            if post_info and post_info.id:
+                yield post_info
             elif post_info is None:
                 filtered_count += 1
-        except Exception as e:
-            logger.debug(f"Erro ao processar post: {e}")
-            continue
+    finally:
+        if filtered_count > 0:
+            logger.info("🚫 %s posts filtrados (anúncios/promocionais)", filtered_count)
 
-    if filtered_count > 0:
-        logger.info(f"🚫 {filtered_count} posts filtrados (anúncios/promocionais)")
-
-    return posts
-
-
-def extract_post_data(post_elem, soup):
-    post_info = {
-        "id": '',
-        "title": '',
-        "content": '',
-        "url": '',
-        "s_img": '',
-        "m_img": [],
-        "video": '',
-        "video_fallback_url": ''
-    }
-
-    def fix_url(url):
-        if not url:
-            return ''
-        if url.startswith('//'):
-            return 'https:' + url
-        if not url.startswith('http'):
-            return 'https://' + url
-        return url
-
-    def get_high_res_image_url(preview_url):
-        if not preview_url:
-            return ''
-        if '?' in preview_url:
-            base_url = preview_url.split('?')[0]
-        else:
-            base_url = preview_url
-        if 'preview.redd.it' in base_url:
-            high_res_url = base_url.replace('preview.redd.it', 'i.redd.it')
-            logger.debug(f"Converted to high-res: {high_res_url}")
-            return high_res_url
-        return base_url
-
-    def extract_gallery_images(post_elem):
-        seen = set()
-        images = []
-
-        for link in post_elem.find_all('a', href=True):
-            href = link.get('href', '')
-            if 'redd.it' not in href:
+
+def parse_reddit_tree(root, limit=None):
+    """
+    Extract up to *limit* posts from a page parsed by _parse_stream.
+
+    Returns None when the page holds no post elements at all (not a listing),
+    and [] when it is a listing whose posts were all filtered or already posted.
+    """
+    post_elements = _select_post_elements(root)
+    if not post_elements:
+        return None
+    return list(islice(_iter_post_elements(post_elements), limit))
+
+
+# Pure string rewrites, memoized: the same CDN URLs recur across a listing
+@lru_cache(maxsize=2048)
+def _fix_url(url):
+    if not url:
+        return ''
+    if url.startswith('//'):
+        return 'https:' + url
+    if not url.startswith('http'):
+        return 'https://' + url
+    return url
+
+
+@lru_cache(maxsize=2048)
+def _get_high_res_image_url(preview_url):
+    if not preview_url:
+        return ''
+    if '?' in preview_url:
+        base_url = preview_url.split('?')[0]
+    else:
+        base_url = preview_url
+    if 'preview.redd.it' in base_url:
+        high_res_url = base_url.replace('preview.redd.it', 'i.redd.it')
+        logger.debug("Converted to high-res: %s", high_res_url)
+        return high_res_url
+    return base_url
+
+
+def _is_allowed_url(url):
+    """False for promoted (/user/, /u/) posts and posts from other subreddits."""
+    if not url:
+        return True
+    if '/user/' in url or '/u/' in url:
+        logger.debug("⚠️ Post promocional ignorado: %s", url)
+        return False
+    if not url.startswith(_ALLOWED_URL_PREFIXES):
+        logger.debug("⚠️ Post de outro subreddit ignorado: %s", url)
+        return False
+    return True
+
+
+MAX_GALLERY_IMAGES = 4  # a tweet carries at most 4 images
+
+
+def _extract_gallery_images(post_elem):
+    # One walk over <a> and <img> together; <img> candidates are only used
+    # when no linked image was found, as before. The walk stops at the 4th
+    # linked image, but not at the 4th <img>: a later link would still win.
+    link_images, img_images = [], []
+    seen_links, seen_imgs = set(), set()
+
+    for node in post_elem.iter('a', 'img'):
+        if node.tag == 'a':
+            href = node.get('href', '')
+            if not _IMG_URL_RE.search(href):
                 continue
-            if not any(ext in href.lower() for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp']):
+            high_res = _get_high_res_image_url(_fix_url(_unamp(href)))
+            if high_res and high_res not in seen_links:
+                seen_links.add(high_res)
+                link_images.append(high_res)
+                if len(link_images) == MAX_GALLERY_IMAGES:
+                    break
+        elif not link_images and len(img_images) < MAX_GALLERY_IMAGES:
+            src = node.get('src', '')
+            if 'redd.it' not in src:
                 continue
-            high_res = get_high_res_image_url(fix_url(href.replace('&amp;', '&')))
-            if high_res and high_res not in seen:
-                seen.add(high_res)
-                images.append(high_res)
-
-        if not images:
-            for img in post_elem.find_all('img'):
-                src = img.get('src', '')
-                if 'redd.it' not in src:
+            width = node.get('width', '9999')
+            try:
+                if int(width) < 300:
                     continue
-                width = img.get('width', '9999')
-                try:
-                    if int(width) < 300:
-                        continue
-                except (ValueError, TypeError):
-                    pass
-                high_res = get_high_res_image_url(fix_url(src.replace('&amp;', '&')))
-                if high_res and high_res not in seen:
-                    seen.add(high_res)
-                    images.append(high_res)
-
-        return images[:4]
+            except (ValueError, TypeError):
+                pass
+            high_res = _get_high_res_image_url(_fix_url(_unamp(src)))
+            if high_res and high_res not in seen_imgs:
+                seen_imgs.add(high_res)
+                img_images.append(high_res)
+
+    return link_images or img_images
+
+
+def extract_post_data(post_elem):
+    post_info = PostInfo()
+    # One copy of the attributes into a plain dict; every lookup below is local
+    attrs = dict(post_elem.attrib)
+
+    # Stickied posts never get here (see _iter_post_elements). Off-subreddit and
+    # promoted posts are rejected on their URL before any content, thumbnail
+    # or gallery scanning.
+    is_new_reddit = post_elem.tag == 'shreddit-post'
+    if not is_new_reddit and not USE_LEGACY_OLD_REDDIT:
+        return None
 
-    is_new_reddit = post_elem.name == 'shreddit-post'
+    post_info.id = _element_post_id(post_elem)
 
     if is_new_reddit:
-        post_info['id'] = post_elem.get('id', '').replace('t3_', '')
-        post_info['title'] = post_elem.get('post-title', '')
-        permalink = post_elem.get('permalink', '')
+        post_info.title = attrs.get('post-title', '')
+        permalink = attrs.get('permalink', '')
         if permalink:
-            post_info['url'] = f"https://www.reddit.com{permalink}"
-        content_html = post_elem.get('content-href', '')
-        if content_html:
-            post_info['content'] = content_html[:500]
-        thumbnail = post_elem.get('thumbnail', '')
-        if thumbnail and 'redd.it' in thumbnail:
-            high_res = get_high_res_image_url(thumbnail)
-            post_info['s_img'] = fix_url(high_res)
-        gallery_images = extract_gallery_images(post_elem)
-        if len(gallery_images) > 1:
-            post_info['m_img'] = gallery_images
-            post_info['s_img'] = ''
-        elif len(gallery_images) == 1 and not post_info['s_img']:
-            post_info['s_img'] = gallery_images[0]
-        if post_elem.get('is-video') == 'true':
-            post_info['video'] = post_info['url']
-            post_info['s_img'] = ''
-            post_info['m_img'] = []
+            post_info.url = f"https://www.reddit.com{permalink}"
     else:
-        post_id = post_elem.get('data-fullname', '').replace('t3_', '')
-        if not post_id:
-            post_id = post_elem.get('id', '').replace('thing_t3_', '')
-        post_info['id'] = post_id
-        title_elem = post_elem.find('a', class_='title')
-        if not title_elem:
-            title_elem = post_elem.find('p', class_='title')
-        if title_elem:
-            post_info['title'] = title_elem.get_text(strip=True)
-        permalink = post_elem.get('data-permalink', '')
+        title_elem = _find_by_class(post_elem, 'a', 'title')
+        if title_elem is None:
+            title_elem = _find_by_class(post_elem, 'p', 'title')
+        if title_elem is not None:
+            post_info.title = _text(title_elem)
+        permalink = attrs.get('data-permalink', '')
         if permalink:
-            post_info['url'] = f"https://www.reddit.com{permalink}"
-        elif title_elem and title_elem.get('href'):
-            href = title_elem.get('href')
+            post_info.url = f"https://www.reddit.com{permalink}"
+        elif title_elem is not None and (href := title_elem.get('href')):
             if href.startswith('/r/'):
-                post_info['url'] = f"https://www.reddit.com{href}"
+                post_info.url = f"https://www.reddit.com{href}"
             else:
-                post_info['url'] = href
-        expando = post_elem.find('div', class_='expando')
-        if expando:
-            usertext = expando.find('div', class_='usertext-body')
-            if usertext:
-                post_info['content'] = usertext.get_text(strip=True)[:500]
-        thumbnail = post_elem.get('data-thumbnail', '')
-        if thumbnail and 'redd.it' in thumbnail and thumbnail not in ['self', 'default', 'nsfw', 'spoiler']:
-            high_res = get_high_res_image_url(thumbnail)
-            post_info['s_img'] = fix_url(high_res)
-        if not post_info['s_img']:
-            preview = post_elem.find('a', class_='thumbnail')
-            if preview:
-                img = preview.find('img')
-                if img and img.get('src'):
-                    src = img.get('src')
-                    if 'redd.it' in src:
-                        high_res = get_high_res_image_url(src)
-                        post_info['s_img'] = fix_url(high_res)
-        gallery_images = extract_gallery_images(post_elem)
-        if len(gallery_images) > 1:
-            post_info['m_img'] = gallery_images
-            post_info['s_img'] = ''
-        elif len(gallery_images) == 1 and not post_info['s_img']:
-            post_info['s_img'] = gallery_images[0]
-        domain = post_elem.get('data-domain', '')
-        is_video = post_elem.get('data-is-video', 'false') == 'true'
-        if is_video or domain == 'v.redd.it':
-            post_info['video'] = post_info['url']
-            post_info['s_img'] = ''
-            post_info['m_img'] = []
+                post_info.url = href
 
-    if post_elem.get('data-stickied') == 'true' or post_elem.get('stickied') == 'true':
+    if not _is_allowed_url(post_info.url):
         return None
 
-    if post_info['url']:
-        if '/user/' in post_info['url'] or '/u/' in post_info['url']:
-            logger.debug(f"⚠️ Post promocional ignorado: {post_info['url']}")
-            return None
-        allowed_subreddits = ['Overwatch', 'Overwatch_Memes']
-        is_from_allowed = any(f'/r/{sub}/' in post_info['url'] for sub in allowed_subreddits)
-        if not is_from_allowed:
-            logger.debug(f"⚠️ Post de outro subreddit ignorado: {post_info['url']}")
-            return None
-
-    if not post_info['id'] or not post_info['title']:
+    if not post_info.id or not post_info.title:
         return None
 
-    if post_info['s_img']:
-        logger.debug(f"Post {post_info['id']}: Imagem única encontrada")
-    if post_info['m_img']:
-        logger.debug(f"Post {post_info['id']}: Galeria com {len(post_info['m_img'])} imagens")
-    if post_info['video']:
-        logger.debug(f"Post {post_info['id']}: Vídeo encontrado")
+    if is_new_reddit:
+        content_html = attrs.get('content-href', '')
+        if content_html:
+            post_info.content = content_html[:500]
+        thumbnail = attrs.get('thumbnail', '')
+        if thumbnail and 'redd.it' in thumbnail:
+            high_res = _get_high_res_image_url(thumbnail)
+            post_info.s_img = _fix_url(high_res)
+        gallery_images = _extract_gallery_images(post_elem)
+        if len(gallery_images) > 1:
+            post_info.m_img = gallery_images
+            post_info.s_img = ''
+        elif len(gallery_images) == 1 and not post_info.s_img:
+            post_info.s_img = gallery_images[0]
+        if attrs.get('is-video') == 'true':
+            post_info.video = post_info.url
+            post_info.s_img = ''
+            post_info.m_img = []
+    else:
+        expando = _find_by_class(post_elem, 'div', 'expando')
+        if expando is not None:
+            usertext = _find_by_class(expando, 'div', 'usertext-body')
+            if usertext is not None:
+                post_info.content = _text(usertext)[:500]
+        thumbnail = attrs.get('data-thumbnail', '')
+        if thumbnail and 'redd.it' in thumbnail and thumbnail not in ['self', 'default', 'nsfw', 'spoiler']:
+            high_res = _get_high_res_image_url(thumbnail)
+            post_info.s_img = _fix_url(high_res)
+        if not post_info.s_img:
+            preview = _find_by_class(post_elem, 'a', 'thumbnail')
+            if preview is not None:
+                img = preview.find('.//img')
+                src = img.get('src') if img is not None else None
+                if src:
+                    if 'redd.it' in src:
+                        high_res = _get_high_res_image_url(src)
+                        post_info.s_img = _fix_url(high_res)
+        gallery_images = _extract_gallery_images(post_elem)
+        if len(gallery_images) > 1:
+            post_info.m_img = gallery_images
+            post_info.s_img = ''
+        elif len(gallery_images) == 1 and not post_info.s_img:
+            post_info.s_img = gallery_images[0]
+        domain = attrs.get('data-domain', '')
+        is_video = attrs.get('data-is-video', 'false') == 'true'
+        if is_video or domain == 'v.redd.it':
+            post_info.video = post_info.url
+            post_info.s_img = ''
+            post_info.m_img = []
+
+    if post_info.s_img:
+        logger.debug("Post %s: Imagem única encontrada", post_info.id)
+    if post_info.m_img:
+        logger.debug("Post %s: Galeria com %s imagens", post_info.id, len(post_info.m_img))
+    if post_info.video:
+        logger.debug("Post %s: Vídeo encontrado", post_info.id)
 
     return post_info
 
@@ -243,106 +483,200 @@ def extract_post_data(post_elem, soup):
 # Fetching
 # ---------------------------------------------------------------------------
 
-def fetch_posts_from_reddit_html(subreddit, limit=50):
+def _fetch_listing(url, url_index, total, proxy_dict, active_proxy, limit, stop):
     """
-    Busca posts do Reddit via HTML scraping.
+    Fetch and parse one listing URL; returns its posts ([] if the listing had
+    nothing new) or None on any failure.
 
-    Proxy selection is delegated to proxy_manager: tries Proxy 1 first,
-    falls back to Proxy 2 (if configured), then falls back to a direct
-    connection as a last resort.
+    *stop* is set once another URL has won: the download is abandoned at the
+    next chunk and nothing else (logging, breaker updates, database reads)
+    happens for this attempt.
     """
-    session = requests.Session()
-    session.headers.update({
-        'User-Agent': (
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-            'AppleWebKit/537.36 (KHTML, like Gecko) '
-            'Chrome/131.0.0.0 Safari/537.36'
-        ),
-        'Accept': (
-            'text/html,application/xhtml+xml,application/xml;'
-            'q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8'
-        ),
-        'Accept-Language': 'en-US,en;q=0.9,pt-BR;q=0.8,pt;q=0.7',
-        'Accept-Encoding': 'gzip, deflate, br, zstd',
-        'DNT': '1',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-        'Sec-Fetch-Dest': 'document',
-        'Sec-Fetch-Mode': 'navigate',
-        'Sec-Fetch-Site': 'none',
-        'Sec-Fetch-User': '?1',
-        'sec-ch-ua': '"Google Chrome";v="131", "Chromium";v="131", "Not_A Brand";v="24"',
-        'sec-ch-ua-mobile': '?0',
-        'sec-ch-ua-platform': '"Windows"',
-        'Cache-Control': 'max-age=0',
-    })
-
-    # --- Proxy selection with fallback ---
-    active_proxy = get_available_proxy()
-    if active_proxy:
-        proxy_dict = get_requests_proxies(active_proxy)
-        session.proxies.update(proxy_dict)
-        logger.info(f"🔐 Using {active_proxy['label']} for Reddit scraping")
-    else:
-        logger.warning("⚠️  All proxies offline – attempting direct connection")
-
-    # Warm up cookies
+    if stop.is_set():
+        return None
     try:
-        logger.info("🍪 Obtaining cookies from homepage…")
-        home_resp = session.get("https://old.reddit.com/", timeout=10)
-        if home_resp.status_code == 200:
-            logger.info(f"   ✅ Cookies set: {len(session.cookies)}")
-        else:
-            logger.warning(f"   ⚠️ Cookie warmup status: {home_resp.status_code}")
+        logger.info("🌐 Attempt %s/%s: %s", url_index, total, url)
+        # Streamed: error pages are closed after the status line, without
+        # downloading their body. Short connect timeout: the proxy may not
+        # have been probed, and a dead one should fail fast.
+        with _SESSION.get(
+            url, proxies=proxy_dict, timeout=(CONNECT_TIMEOUT, 30), allow_redirects=True, stream=True
+        ) as response:
+            if stop.is_set():
+                return None
+            logger.info("   Status: %s", response.status_code)
+
+            if response.status_code == 403:
+                logger.warning("   ❌ 403 Forbidden on attempt %s", url_index)
+                return None
+
+            if response.status_code == 429 and active_proxy:
+                report_proxy_failure(active_proxy)
+
+            response.raise_for_status()
+            # Raw bytes go straight to lxml as they arrive; no str decode/copy of the page
+            root, received = _parse_stream(response.iter_content(_STREAM_CHUNK), stop)
+
+        if root is None or stop.is_set():
+            return None
+        logger.info("   📄 HTML received: %s bytes", received)
+        posts = parse_reddit_tree(root, limit)
+
+        if posts is None:
+            logger.warning("   ⚠️ No posts extracted from HTML on attempt %s", url_index)
+        elif not posts:
+            logger.info("   📭 Listing fetched on attempt %s, but it has nothing new", url_index)
+        return posts
+
+    except requests.exceptions.HTTPError as e:
+        if not stop.is_set():
+            logger.warning("❌ HTTP %s on attempt %s", e.response.status_code, url_index)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+        # ProxyError, ConnectTimeout, resets, read timeouts: the connection
+        # through the (possibly unprobed) proxy failed
+        if not stop.is_set():
+            logger.warning("❌ Connection error on attempt %s: %s", url_index, e)
+            report_proxy_failure(active_proxy)
     except Exception as e:
-        logger.warning(f"   ⚠️ Cookie warmup error: {e}")
+        if not stop.is_set():
+            logger.warning("❌ Failure on attempt %s: %s", url_index, e)
+    return None
 
-    urls = [
-        f"https://old.reddit.com/r/{subreddit}/",
-        f"https://old.reddit.com/r/{subreddit}/hot/",
-        f"https://www.reddit.com/r/{subreddit}/",
-        f"https://www.reddit.com/r/{subreddit}/hot/",
-    ]
 
-    for url_index, url in enumerate(urls, 1):
-        try:
-            logger.info(f"🌐 Attempt {url_index}/{len(urls)}: {url}")
-            response = session.get(url, timeout=30, allow_redirects=True)
-            logger.info(f"   Status: {response.status_code}")
+def _fetch_through(subreddit, limit, active_proxy):
+    """
+    Fetch one subreddit through *active_proxy* (None = direct connection).
 
-            if response.status_code == 403:
-                logger.warning("   ❌ 403 Forbidden – trying next URL…")
-                continue
+    All listing URLs are requested at once and the first response that
+    yields posts wins, so the fetch takes as long as the fastest working
+    URL instead of waiting on slower or dead ones. Returns [] when the
+    listings were fetched but had nothing new, None when every URL failed.
+    """
+    proxy_dict = get_requests_proxies(active_proxy)
+    if active_proxy:
+        logger.info("🔐 Using %s for Reddit scraping", active_proxy['label'])
+    else:
+        logger.warning("⚠️  All proxies offline – attempting direct connection")
 
-            response.raise_for_status()
-            logger.info(f"   📄 HTML received: {len(response.text)} bytes")
-            posts = parse_reddit_html(response.text)
+    # Warm up cookies – only once; the shared session keeps them between calls
+    if any(cookie.domain.endswith('reddit.com') for cookie in _SESSION.cookies):
+        logger.info("🍪 Reusing cookies (n=%s)", len(_SESSION.cookies))
+    else:
+        try:
+            logger.info("🍪 Obtaining cookies from homepage…")
+            # Only the Set-Cookie headers matter: the streamed body is never
+            # downloaded or decompressed
+            with _SESSION.get(_HOMEPAGE_URL, proxies=proxy_dict, timeout=10, stream=True) as home_resp:
+                status = home_resp.status_code
+            if status == 200:
+                logger.info("   ✅ Cookies set: %s", len(_SESSION.cookies))
+            else:
+                logger.warning("   ⚠️ Cookie warmup status: %s", status)
+        except Exception as e:
+            logger.warning("   ⚠️ Cookie warmup error: %s", e)
+
+    urls = _LISTING_URLS.get(subreddit) or _listing_urls(subreddit)
 
+    stop = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=len(urls))
+    try:
+        futures = [
+            pool.submit(_fetch_listing, url, url_index, len(urls), proxy_dict, active_proxy, limit, stop)
+            for url_index, url in enumerate(urls, 1)
+        ]
+        nothing_new = False
+        for future in as_completed(futures):
+            posts = future.result()
+            if posts is None:
+                continue
             if not posts:
-                logger.warning("   ⚠️ No posts extracted from HTML")
+                # another URL (front page vs /hot/) may still have new posts
+                nothing_new = True
                 continue
 
-            posts = posts[:limit]
-            logger.info(f"✅ {len(posts)} posts extracted from r/{subreddit}!")
+            logger.info("✅ %s posts extracted from r/%s!", len(posts), subreddit)
             for i, post in enumerate(posts[:3]):
-                logger.info(f"   Post {i+1}: {post['title'][:50]}… (ID: {post['id']})")
+                logger.info("   Post %s: %s… (ID: %s)", i+1, post.title[:50], post.id)
             return posts
-
-        except requests.exceptions.HTTPError as e:
-            logger.warning(f"❌ HTTP {e.response.status_code} on attempt {url_index}")
-            continue
-        except Exception as e:
-            logger.warning(f"❌ Failure on attempt {url_index}: {e}")
-            continue
-
+    finally:
+        # The other URLs are no longer needed: queued ones are cancelled and
+        # running ones close their response at the next chunk
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if nothing_new:
+        logger.info("📭 r/%s fetched, but every listed post was already posted or filtered", subreddit)
+        return []
     logger.error("❌ All attempts failed for Reddit HTML scraping")
     return None
 
 
+def fetch_posts_from_reddit_html(subreddit, limit=50):
+    """
+    Busca posts do Reddit via HTML scraping.
+
+    Proxy selection is delegated to proxy_manager: tries Proxy 1 first,
+    falls back to Proxy 2 (if configured). A direct connection is only used
+    when no proxy was usable to begin with; once a proxy has failed the
+    fetch, it never falls back to the runner's own IP.
+
+    The scrape itself is the proxy health check: the first proxy is used
+    without a separate probe, and the proxies are only probed (and the
+    fetch retried once) when that attempt fails.
+    """
+    active_proxy = peek_available_proxy()
+    posts = _fetch_through(subreddit, limit, active_proxy)
+    if posts is not None:
+        # a listing with nothing new still proves the connection works
+        confirm_proxy(active_proxy)
+        return posts
+
+    if active_proxy is None:
+        return None
+
+    # Already-confirmed proxies come straight back from the cache, so this
+    # only probes when the unprobed proxy just failed
+    fallback_proxy = get_available_proxy()
+    if fallback_proxy is None or fallback_proxy is active_proxy:
+        return None
+    logger.warning("🔁 Retrying r/%s with the next available connection", subreddit)
+    return _fetch_through(subreddit, limit, fallback_proxy)
+
+
 # ---------------------------------------------------------------------------
 # Main entry point
 # ---------------------------------------------------------------------------
 
+def _subreddits_by_need():
+    """
+    Subreddits ordered by how few posts they have left in the queue, so a full
+    batch of one subreddit isn't preferred while the other runs dry. Ties are random.
+    """
+    remaining = get_remaining_by_subreddit()
+    order = list(SUBREDDITS)
+    shuffle(order)
+    order.sort(key=lambda sub: remaining.get(sub, 0))
+    return order
+
+
+def _fetch_preferred(subreddits, limit):
+    """
+    Scrape the preferred subreddit; only if that fetch fails is the next one
+    tried, instead of the run falling back to stored batches straight away.
+    A listing with nothing new is a result, not a failure. Returns
+    (subreddit, posts) or (None, None).
+    """
+    for subreddit in subreddits:
+        posts = fetch_posts_from_reddit_html(subreddit, limit)
+        if posts is not None:
+            return subreddit, posts
+        if peek_available_proxy() is None:
+            # every proxy failed: the next subreddit would fail the same way
+            break
+        logger.warning("⚠️ No posts from r/%s, trying next subreddit…", subreddit)
+    return None, None
+
+
 def extractContent():
     """
     Fetch a single new post for the bot to tweet.
@@ -354,46 +688,52 @@ def extractContent():
     """
     initialize_queue_db()
 
-    stats = get_queue_stats()
-    logger.info("=" * 60)
-    logger.info("📊 Queue Status:")
-    logger.info(f"   Stored batches : {stats['batches_count']}/{MAX_JSON_BATCHES}")
-    logger.info(f"   Available posts: {stats['available_posts']}")
-    logger.info(f"   Total posted   : {stats['posted_total']}")
-    if stats['batches']:
-        for batch in stats['batches']:
-            logger.info(
-                f"   • Batch #{batch['batch_id']}: r/{batch['subreddit']} "
-                f"– {batch['remaining']}/{batch['total']} remaining"
-            )
-    logger.info("=" * 60)
-
-    proxy_available = check_proxy_available()
-
-    if proxy_available:
+    # The stats queries only feed this log block, so skip both when INFO is off
+    if logger.isEnabledFor(logging.INFO):
+        stats = get_queue_stats()
+        logger.info("=" * 60)
+        logger.info("📊 Queue Status:")
+        logger.info("   Stored batches : %s/%s", stats['batches_count'], MAX_JSON_BATCHES)
+        logger.info("   Available posts: %s", stats['available_posts'])
+        logger.info("   Total posted   : %s", stats['posted_total'])
+        if stats['batches']:
+            for batch in stats['batches']:
+                logger.info(
+                    "   • Batch #%s: r/%s – %s/%s remaining",
+                    batch['batch_id'], batch['subreddit'], batch['remaining'], batch['total'],
+                )
+        logger.info("=" * 60)
+
+    # Unprobed: the listing fetch itself confirms or rejects the proxy
+    if peek_available_proxy() is not None:
         logger.info("🟢 ONLINE MODE: fetching fresh batch via proxy (HTML scraping)…")
-        subreddit = choice(['Overwatch', 'Overwatch_Memes'])
-        logger.info(f"🎲 Selected subreddit: r/{subreddit}")
-        posts = fetch_posts_from_reddit_html(subreddit, limit=50)
+        subreddits = _subreddits_by_need()
+        logger.info("🎲 Selected subreddit: r/%s", subreddits[0])
+        subreddit, posts = _fetch_preferred(subreddits, limit=50)
         if posts:
-            batch_id = add_json_batch(posts, subreddit)
-            logger.info(f"💾 Batch #{batch_id} saved with {len(posts)} posts")
-            stats = get_queue_stats()
+            # PostInfo becomes a plain dict only here, where the batch is serialized
+            batch_id, stats = add_json_batch([asdict(post) for post in posts], subreddit)
+            logger.info("💾 Batch #%s saved with %s posts", batch_id, len(posts))
             logger.info(
-                f"📊 Queue updated: {stats['batches_count']} batch(es), "
-                f"{stats['available_posts']} posts available"
+                "📊 Queue updated: %s batch(es), %s posts available",
+                stats['batches_count'], stats['available_posts'],
             )
-        else:
+        elif posts is None:
             logger.warning("⚠️ Failed to fetch new posts – using saved batches as fallback")
+        else:
+            logger.info("📭 No new posts on Reddit – using saved batches")
     else:
         logger.info("🔴 OFFLINE MODE: all proxies unavailable, consuming saved batches")
 
+    # The fetch settled the proxy state: if every proxy failed it, the run is offline
+    proxy_available = peek_available_proxy() is not None
+
     logger.info("🔍 Looking for next unseen post…")
     batch_id, post = get_next_unposted_post()
 
     if post:
-        logger.info(f"✨ Post found in batch #{batch_id}")
-        logger.info(f"📤 Title: {post['title'][:70]}…")
+        logger.info("✨ Post found in batch #%s", batch_id)
+        logger.info("📤 Title: %s…", post['title'][:70])
         return [post]
     else:
         logger.error("❌ EMPTY QUEUE! No new posts available.")